@@ -8,17 +8,28 @@ from datetime import datetime, time
 from db import (
     init_db,
     insert_forecast,
-    get_forecasts,
     insert_metar,
-    get_recent_metars,
     insert_rain_event,
+)
+from db_cached import (
+    get_forecasts,
+    get_recent_metars_summary,
+    get_recent_metars_rain_count,
+    get_metar_raw,
     get_rain_events,
     get_rain_stats_by_day,
 )
-from metar_parser import parse_metar
+
+
+@st.cache_resource(show_spinner=False)
+def _schema_bootstrap():
+    """建表 / 建索引每个进程只执行一次，不随页面重跑"""
+    init_db()
+    return True
+
 
 # 初始化数据库
-init_db()
+_schema_bootstrap()
 
 st.set_page_config(page_title="昆岛机场气象记录系统", layout="wide")
 
@@ -52,8 +63,10 @@ def page_forecast():
         if temp_max < temp_min:
             st.warning("最高气温不能低于最低气温。")
         else:
-            insert_forecast(str(date_val), wind, temp_min, temp_max, weather)
-            st.success("✅ 天气预报已保存")
+            if insert_forecast(str(date_val), wind, temp_min, temp_max, weather):
+                st.success("✅ 天气预报已保存")
+            else:
+                st.info("相同的预报记录已存在，未重复保存。")
 
     st.markdown("---")
     st.subheader("历史预报查询")
@@ -78,8 +91,10 @@ def page_forecast():
 
             # 绘制平均气温折线图（(min+max)/2）
             try:
-                df["日期"] = pd.to_datetime(df["日期"])
-                df["平均气温"] = (df["最低温(℃)"] + df["最高温(℃)"]) / 2
+                df["日期"] = pd.to_datetime(df["日期"], format="%Y-%m-%d", cache=True)
+                lo = df["最低温(℃)"].to_numpy()
+                hi = df["最高温(℃)"].to_numpy()
+                df["平均气温"] = (lo + hi) * 0.5
                 df_chart = df.set_index("日期")
 
                 if len(df_chart) > 1:
@@ -105,51 +120,68 @@ def page_metar():
         if not raw.strip():
             st.warning("请先输入报文")
         else:
-            record = parse_metar(raw)
+            # 解析模块只在本页保存报文时才需要，按需导入
+            from metar_parser import parse_metar
+
+            record = parse_metar(raw, include_timestamp=True)
             insert_metar(record)
 
             st.success("✅ 报文已解析并保存")
             st.subheader("解析结果")
-            st.json(record)
+            st.json(record.to_dict())
 
     st.markdown("---")
     st.subheader("📑 最近 METAR 解析记录")
 
-    rows = get_recent_metars(limit=100)
+    tbl = get_recent_metars_summary(limit=100)
 
-    if not rows:
+    if tbl.num_rows == 0:
         st.info("暂无 METAR 数据")
         return
 
-    df = pd.DataFrame(
-        rows,
-        columns=[
-            "报文时间",
-            "站号",
-            "原始报文",
-            "风向(°)",
-            "风速(kt)",
-            "阵风(kt)",
-            "能见度(m)",
-            "温度(℃)",
-            "露点(℃)",
-            "天气(中文)",
-            "是否雨(1是0否)",
-            "雨型",
-            "云1量",
-            "云1高(m)",
-            "云2量",
-            "云2高(m)",
-            "云3量",
-            "云3高(m)",
-        ],
-    )
-
-    st.dataframe(df, use_container_width=True)
-
-    rain_count = df["是否雨(1是0否)"].sum()
+    # id 只用于取原始报文，不在表格中展示
+    ids = tbl.column("id").to_pylist()
+    tbl = tbl.remove_column(0)
+
+    tbl = tbl.rename_columns([
+        "报文时间",
+        "站号",
+        "风向(°)",
+        "风速(kt)",
+        "阵风(kt)",
+        "能见度(m)",
+        "温度(℃)",
+        "露点(℃)",
+        "是否雨(1是0否)",
+        "雨型",
+        "云1量",
+        "云1高(m)",
+        "云2量",
+        "云2高(m)",
+        "云3量",
+        "云3高(m)",
+    ])
+
+    st.dataframe(tbl, use_container_width=True)
+
+    rain_count = get_recent_metars_rain_count(limit=100)
     st.caption(f"📌 最近记录中共有 **{rain_count} 条 METAR 含降水**。")
 
+    # 原始报文不随列表加载，选中某条记录后再单独查询
+    with st.expander("查看原始报文"):
+        keys = list(
+            zip(tbl.column("站号").to_pylist(), tbl.column("报文时间").to_pylist())
+        )
+        idx = st.selectbox(
+            "选择记录",
+            range(len(keys)),
+            index=None,
+            # 同站同时次可能有多条（跨月、更正报），带上记录号区分
+            format_func=lambda i: f"#{ids[i]} {keys[i][0] or '-'} {keys[i][1] or '-'}",
+        )
+        if idx is not None:
+            st.code(get_metar_raw(ids[idx]) or "", language=None)
+
 
 # -------------------------------------------------------------
 # 页面：降水记录
@@ -171,7 +203,7 @@ def page_rain():
     note = st.text_input("备注（可选）")
 
     if st.button("保存降水记录"):
-        start_dt = datetime.combine(d, t).strftime("%Y-%m-%d %H:%M:%S")
+        start_dt = datetime.combine(d, t).isoformat(sep=" ", timespec="seconds")
         insert_rain_event(start_dt, rain_level, rain_code, note)
         st.success("🌧 降水记录已保存")
 
@@ -196,14 +228,22 @@ def page_rain():
             )
             st.dataframe(df, use_container_width=True)
 
-            stats = get_rain_stats_by_day(str(start), str(end))
-            if stats:
-                s_df = pd.DataFrame(stats, columns=["日期", "次数"])
-                s_df["日期"] = pd.to_datetime(s_df["日期"])
-                s_df = s_df.set_index("日期")
+            # 按日统计直接由已查询的明细聚合，无需再查一次数据库
+            # 旧记录的开始时间为 "YYYY-MM-DD HH:MM"，新记录带秒，按 ISO8601 统一解析
+            try:
+                start_ts = pd.to_datetime(df["开始时间"], format="ISO8601", cache=True)
+                s_df = (
+                    df.assign(日期=start_ts.dt.normalize())
+                    .groupby("日期")
+                    .size()
+                    .rename("次数")
+                    .to_frame()
+                )
 
                 st.bar_chart(s_df, y="次数", height=280)
                 st.caption(f"📌 共记录 {s_df['次数'].sum()} 次降水事件。")
+            except Exception as e:
+                st.warning(f"图表渲染时出现问题：{e}")
 
 
 # -------------------------------------------------------------
@@ -228,7 +268,7 @@ def page_analysis():
             return
 
         df = pd.DataFrame(stats, columns=["日期", "次数"])
-        df["日期"] = pd.to_datetime(df["日期"])
+        df["日期"] = pd.to_datetime(df["日期"], format="%Y-%m-%d", cache=True)
         df = df.set_index("日期")
 
         st.bar_chart(df, height=350)
@@ -1,28 +1,141 @@
 # db.py —— 昆岛气象系统数据库模块（SQLite）
 # 支持预报最低温/最高温、METAR 云量、阵风、雨型等
 
+import logging
+import operator
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pyarrow as pa
+import streamlit as st
 
 DB_NAME = "kunda.db"
+POOL_SIZE = 4
+POOL_TIMEOUT = 10  # 秒：等待空闲连接的上限
+
+logger = logging.getLogger(__name__)
+
+
+def _connect():
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, isolation_level=None)
+    # 以下 PRAGMA 仅对当前连接生效，每个池内连接都要设置
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
+
+# 有界连接池：同一时刻每个连接只被一个会话线程使用，
+# WAL 模式下多个读连接可并行，写入仍由 SQLite 串行化
+# 连接在首次取用时才创建（导入模块不打开数据库），最多 POOL_SIZE 个
+_POOL = queue.Queue(maxsize=POOL_SIZE)
+_POOL_LOCK = threading.Lock()
+_pool_opened = 0
+
+
+def _acquire_conn():
+    global _pool_opened
+    try:
+        return _POOL.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _POOL_LOCK:
+        if _pool_opened < POOL_SIZE:
+            # 打开失败时计数不变，异常直接抛给调用方
+            conn = _connect()
+            _pool_opened += 1
+            return conn
+
+    try:
+        return _POOL.get(timeout=POOL_TIMEOUT)
+    except queue.Empty:
+        raise RuntimeError(
+            f"数据库连接池已耗尽：{POOL_TIMEOUT} 秒内未能取得连接（池大小 {POOL_SIZE}）"
+        ) from None
 
 
 @contextmanager
 def get_conn():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+    conn = _acquire_conn()
     try:
         yield conn
     finally:
-        conn.close()
+        if conn.in_transaction:
+            conn.rollback()
+        _POOL.put(conn)
+
+
+def _migrate_legacy_forecasts(conn):
+    """旧版 forecasts 表只有单个 temp 列：补 temp_min / temp_max 并用 temp 回填"""
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(forecasts)")}
+    if "temp" not in cols or "temp_min" in cols:
+        return
+
+    conn.execute("BEGIN")
+    conn.execute("ALTER TABLE forecasts ADD COLUMN temp_min REAL")
+    conn.execute("ALTER TABLE forecasts ADD COLUMN temp_max REAL")
+    conn.execute("UPDATE forecasts SET temp_min = temp, temp_max = temp")
+    conn.commit()
+
+
+def _migrate_dedup_forecasts(conn):
+    """
+    建唯一索引前的迁移：旧库中可能已有重复预报，保留每组最早的一条，
+    返回删除的条数。唯一索引视 NULL 互不相等，含 NULL 的记录本就允许
+    重复，只删除键列全部非 NULL 的重复行，与索引约束保持一致
+    """
+    cur = conn.execute(
+        """
+        DELETE FROM forecasts
+        WHERE date IS NOT NULL AND wind IS NOT NULL
+          AND temp_min IS NOT NULL AND temp_max IS NOT NULL
+          AND weather IS NOT NULL
+          AND id NOT IN (
+            SELECT MIN(id)
+            FROM forecasts
+            GROUP BY date, wind, temp_min, temp_max, weather
+          )
+        """
+    )
+    return cur.rowcount
+
+
+def _create_forecast_unique_index(conn):
+    """
+    (date, wind, temp_min, temp_max, weather) 唯一索引：重复提交的预报不再插入。
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_forecasts_natural'"
+    ).fetchone()
+    if exists:
+        return
+
+    conn.execute("BEGIN")
+    # 先去重，否则唯一索引建不起来；与建索引同一事务，失败则一并回滚
+    removed = _migrate_dedup_forecasts(conn)
+    if removed:
+        logger.warning("建立 ux_forecasts_natural 前删除了 %d 条重复预报记录", removed)
+    conn.execute(
+        """
+        CREATE UNIQUE INDEX ux_forecasts_natural
+        ON forecasts(date, wind, temp_min, temp_max, weather)
+        """
+    )
+    conn.commit()
 
 
 def init_db():
     """初始化数据库并创建数据表"""
     with get_conn() as conn:
-        c = conn.cursor()
+        # WAL 写入数据库文件，设置一次即对所有连接生效：读写互不阻塞
+        conn.execute("PRAGMA journal_mode=WAL")
 
         # ------------------ 预报表：最低温 / 最高温 ------------------
-        c.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS forecasts (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -35,9 +148,11 @@ def init_db():
             )
             """
         )
+        _migrate_legacy_forecasts(conn)
+        _create_forecast_unique_index(conn)
 
         # ------------------ METAR 解析结果表（完整字段） ------------------
-        c.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS metars (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -73,9 +188,10 @@ def init_db():
             )
             """
         )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_metars_created ON metars(created_at DESC)")
 
         # ------------------ 降水事件表 ------------------
-        c.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS rain_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -87,8 +203,7 @@ def init_db():
             )
             """
         )
-
-        conn.commit()
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rain_events_start ON rain_events(start_time)")
 
 
 # -----------------------------------------------------------
@@ -96,24 +211,27 @@ def init_db():
 # -----------------------------------------------------------
 
 def insert_forecast(date_str, wind, temp_min, temp_max, weather):
+    """写入一条预报；完全相同的预报已存在时不重复写入，返回是否新增"""
     with get_conn() as conn:
-        c = conn.cursor()
-        c.execute(
+        cur = conn.execute(
             """
             INSERT INTO forecasts (date, wind, temp_min, temp_max, weather)
             VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
             """,
             (date_str, wind, temp_min, temp_max, weather),
         )
-        conn.commit()
+    if cur.rowcount == 0:
+        return False
+
+    st.cache_data.clear()
+    return True
 
 
 def get_forecasts(start_date=None, end_date=None):
     with get_conn() as conn:
-        c = conn.cursor()
-
         if start_date and end_date:
-            c.execute(
+            return conn.execute(
                 """
                 SELECT date, wind, temp_min, temp_max, weather
                 FROM forecasts
@@ -121,113 +239,154 @@ def get_forecasts(start_date=None, end_date=None):
                 ORDER BY date
                 """,
                 (start_date, end_date),
-            )
+            ).fetchall()
         else:
-            c.execute(
+            return conn.execute(
                 """
                 SELECT date, wind, temp_min, temp_max, weather
                 FROM forecasts
                 ORDER BY date DESC
                 LIMIT 50
                 """
-            )
-
-        return c.fetchall()
+            ).fetchall()
 
 
 # -----------------------------------------------------------
 #         METAR 解析记录（METAR）
 # -----------------------------------------------------------
 
-def insert_metar(record: dict):
-    """将 parse_metar() 返回结果写入数据库"""
+_INSERT_METAR_SQL = """
+    INSERT INTO metars (
+        obs_time, station, raw,
+        wind_dir, wind_speed, wind_gust,
+        visibility,
+        temp, dewpoint,
+        weather, rain_flag, rain_level_cn,
+        cloud_1_amount, cloud_1_height_m,
+        cloud_2_amount, cloud_2_height_m,
+        cloud_3_amount, cloud_3_height_m
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+_METAR_FIELDS = operator.attrgetter(
+    "obs_time", "station", "raw",
+    "wind_direction", "wind_speed", "wind_gust",
+    "visibility",
+    "temperature", "dewpoint",
+    "weather", "is_raining", "rain_type",
+    "clouds",
+)
+
+
+_NO_CLOUD = (None, None, None)
+
+
+def _metar_row(record):
+    """把 parse_metar() 返回结果展开为 metars 表的一行（18 个字段）"""
+    (
+        obs_time, station, raw,
+        wind_dir_raw, wind_speed, wind_gust,
+        visibility,
+        temp, dewpoint,
+        weather_list, is_raining, rain_type,
+        clouds,
+    ) = _METAR_FIELDS(record)
 
-    station = record.get("station")
-    obs_time = record.get("obs_time")
-    raw = record.get("raw")
-
-    wind_dir_raw = record.get("wind_direction")
     wind_dir = str(wind_dir_raw) if wind_dir_raw is not None else None
-
-    wind_speed = record.get("wind_speed")
-    wind_gust = record.get("wind_gust")
-
-    visibility = record.get("visibility")
-
-    temp = record.get("temperature")
-    dewpoint = record.get("dewpoint")
-
-    weather_list = record.get("weather") or []
     weather_text = ", ".join(weather_list) if weather_list else None
-
-    is_raining = bool(record.get("is_raining"))
     rain_flag = 1 if is_raining else 0
-    rain_level_cn = record.get("rain_type")
 
-    clouds = record.get("clouds") or []
+    # 云层为 (amount, height_ft, height_m) 元组，不足三层的用空层补齐
+    (
+        (c1_amount, _, c1_height_m),
+        (c2_amount, _, c2_height_m),
+        (c3_amount, _, c3_height_m),
+    ) = (*(clouds or ()), _NO_CLOUD, _NO_CLOUD, _NO_CLOUD)[:3]
+
+    return (
+        obs_time,
+        station,
+        raw,
+        wind_dir,
+        wind_speed,
+        wind_gust,
+        visibility,
+        temp,
+        dewpoint,
+        weather_text,
+        rain_flag,
+        rain_type,
+        c1_amount,
+        c1_height_m,
+        c2_amount,
+        c2_height_m,
+        c3_amount,
+        c3_height_m,
+    )
+
+
+def insert_metar(record):
+    """将 parse_metar() 返回结果写入数据库"""
+    with get_conn() as conn:
+        conn.execute(_INSERT_METAR_SQL, _metar_row(record))
+    st.cache_data.clear()
 
-    def cloud(i):
-        if i < len(clouds):
-            return clouds[i].get("amount"), clouds[i].get("height_m")
-        return None, None
 
-    c1_amount, c1_height = cloud(0)
-    c2_amount, c2_height = cloud(1)
-    c3_amount, c3_height = cloud(2)
+def insert_metars_bulk(records):
+    """批量写入多条 parse_metar() 结果，整批只提交一次事务"""
+    rows = [_metar_row(r) for r in records]
+    if not rows:
+        return
 
     with get_conn() as conn:
-        c = conn.cursor()
-
-        c.execute(
-            """
-            INSERT INTO metars (
-                obs_time, station, raw,
-                wind_dir, wind_speed, wind_gust,
-                visibility,
-                temp, dewpoint,
-                weather, rain_flag, rain_level_cn,
-                cloud_1_amount, cloud_1_height_m,
-                cloud_2_amount, cloud_2_height_m,
-                cloud_3_amount, cloud_3_height_m
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                obs_time,
-                station,
-                raw,
-                wind_dir,
-                wind_speed,
-                wind_gust,
-                visibility,
-                temp,
-                dewpoint,
-                weather_text,
-                rain_flag,
-                rain_level_cn,
-                c1_amount,
-                c1_height,
-                c2_amount,
-                c2_height,
-                c3_amount,
-                c3_height,
-            ),
-        )
-
+        # 出错时 get_conn() 归还连接前会回滚未提交的事务
+        conn.execute("BEGIN")
+        conn.executemany(_INSERT_METAR_SQL, rows)
         conn.commit()
-
-
-def get_recent_metars(limit=50):
+    st.cache_data.clear()
+
+
+# METAR 摘要表的列类型，一次定义，直接构造 Arrow 表交给 st.dataframe
+_METAR_SUMMARY_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("obs_time", pa.string()),
+        ("station", pa.string()),
+        ("wind_dir", pa.string()),
+        ("wind_speed", pa.float32()),
+        ("wind_gust", pa.float32()),
+        ("visibility", pa.int32()),
+        ("temp", pa.float32()),
+        ("dewpoint", pa.float32()),
+        ("rain_flag", pa.int8()),
+        ("rain_level_cn", pa.string()),
+        ("cloud_1_amount", pa.string()),
+        ("cloud_1_height_m", pa.float32()),
+        ("cloud_2_amount", pa.string()),
+        ("cloud_2_height_m", pa.float32()),
+        ("cloud_3_amount", pa.string()),
+        ("cloud_3_height_m", pa.float32()),
+    ]
+)
+
+
+def get_recent_metars_summary(limit=50):
+    """
+    最近的 METAR 记录摘要（不含原始报文与天气文字），返回 pyarrow.Table
+    首列 id 供按行取原始报文，展示时可隐藏
+    """
     with get_conn() as conn:
-        c = conn.cursor()
-        c.execute(
+        rows = conn.execute(
             """
             SELECT
-                obs_time, station, raw,
+                id,
+                obs_time, station,
                 wind_dir, wind_speed, wind_gust,
                 visibility,
                 temp, dewpoint,
-                weather, rain_flag, rain_level_cn,
+                rain_flag, rain_level_cn,
                 cloud_1_amount, cloud_1_height_m,
                 cloud_2_amount, cloud_2_height_m,
                 cloud_3_amount, cloud_3_height_m
@@ -236,77 +395,109 @@ def get_recent_metars(limit=50):
             LIMIT ?
             """,
             (limit,),
-        )
-        return c.fetchall()
+        ).fetchall()
+
+    schema = _METAR_SUMMARY_SCHEMA
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.Table.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def get_recent_metars_rain_count(limit=50):
+    """最近 limit 条 METAR 中含降水的条数，在 SQL 内聚合"""
+    with get_conn() as conn:
+        return conn.execute(
+            """
+            SELECT COUNT(*) FILTER (WHERE rain_flag = 1)
+            FROM (
+                SELECT rain_flag
+                FROM metars
+                ORDER BY created_at DESC
+                LIMIT ?
+            )
+            """,
+            (limit,),
+        ).fetchone()[0]
+
+
+def get_metar_raw(metar_id):
+    """
+    按记录 id 取原始报文，用于展开查看
+    （站号 + DDHHMMZ 每月都会重复，更正报也同时次，不能作为定位键）
+    """
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT raw FROM metars WHERE id = ?",
+            (metar_id,),
+        ).fetchone()
+    return row[0] if row else None
 
 
 # -----------------------------------------------------------
 #           降水事件记录（Rain Events）
 # -----------------------------------------------------------
 
+def _next_day(date_str):
+    """YYYY-MM-DD 的次日，用作 start_time 半开区间的上界"""
+    return (date.fromisoformat(date_str) + timedelta(days=1)).isoformat()
+
+
 def insert_rain_event(start_time_str, rain_level_cn, rain_code, note):
     with get_conn() as conn:
-        c = conn.cursor()
-        c.execute(
+        conn.execute(
             """
             INSERT INTO rain_events (start_time, rain_level_cn, rain_code, note)
             VALUES (?, ?, ?, ?)
             """,
             (start_time_str, rain_level_cn, rain_code, note),
         )
-        conn.commit()
+    st.cache_data.clear()
 
 
 def get_rain_events(start_date=None, end_date=None):
     with get_conn() as conn:
-        c = conn.cursor()
-
         if start_date and end_date:
-            c.execute(
+            return conn.execute(
                 """
                 SELECT start_time, rain_level_cn, rain_code, note
                 FROM rain_events
-                WHERE date(start_time) BETWEEN ? AND ?
+                WHERE start_time >= ? AND start_time < ?
                 ORDER BY start_time
                 """,
-                (start_date, end_date),
-            )
+                (start_date, _next_day(end_date)),
+            ).fetchall()
         else:
-            c.execute(
+            return conn.execute(
                 """
                 SELECT start_time, rain_level_cn, rain_code, note
                 FROM rain_events
                 ORDER BY start_time DESC
                 LIMIT 100
                 """
-            )
-
-        return c.fetchall()
+            ).fetchall()
 
 
 def get_rain_stats_by_day(start_date=None, end_date=None):
     with get_conn() as conn:
-        c = conn.cursor()
-
         if start_date and end_date:
-            c.execute(
+            return conn.execute(
                 """
                 SELECT date(start_time), COUNT(*)
                 FROM rain_events
-                WHERE date(start_time) BETWEEN ? AND ?
+                WHERE start_time >= ? AND start_time < ?
                 GROUP BY date(start_time)
                 ORDER BY date(start_time)
                 """,
-                (start_date, end_date),
-            )
+                (start_date, _next_day(end_date)),
+            ).fetchall()
         else:
-            c.execute(
+            return conn.execute(
                 """
                 SELECT date(start_time), COUNT(*)
                 FROM rain_events
                 GROUP BY date(start_time)
                 ORDER BY date(start_time)
                 """
-            )
-
-        return c.fetchall()
+            ).fetchall()
@@ -0,0 +1,37 @@
+# db_cached.py —— 数据库只读查询的缓存层
+# Streamlit 每次控件交互都会整页重跑，查询结果按参数缓存 60 秒；
+# db.py 中的写入函数成功后会清空缓存，新数据立即可见
+
+import streamlit as st
+
+import db
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_forecasts(start_date=None, end_date=None):
+    return db.get_forecasts(start_date, end_date)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_recent_metars_summary(limit=50):
+    return db.get_recent_metars_summary(limit)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_recent_metars_rain_count(limit=50):
+    return db.get_recent_metars_rain_count(limit)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_metar_raw(metar_id):
+    return db.get_metar_raw(metar_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_rain_events(start_date=None, end_date=None):
+    return db.get_rain_events(start_date, end_date)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_rain_stats_by_day(start_date=None, end_date=None):
+    return db.get_rain_stats_by_day(start_date, end_date)
@@ -3,168 +3,497 @@
 # 结合你之前的 ConDaoWeatherSystem 解析逻辑，并增加云量(ft→m)解析
 
 import re
+import sys
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
+import numpy as np
 
-def _parse_temp_pair(metar_text: str):
-    """解析温度/露点对，格式: 28/24 或 M02/M05"""
-    temp_match = re.search(r'\b(M?\d{2})/(M?\d{2})\b', metar_text)
-    if not temp_match:
-        return None, None
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖，未安装时走纯 Python 正则路径
+    njit = None
 
-    temp_str = temp_match.group(1)
-    dew_str = temp_match.group(2)
+# 整数字段的缺测值（parse_metar_batch 数组与 numba 扫描内核共用）
+MISSING = int(np.iinfo(np.int16).min)
 
-    def to_value(s: str) -> int:
-        if s.startswith("M"):
-            return -int(s[1:])
-        return int(s)
+# 风、云合并为一个带命名分组的正则，
+# parse_metar 只需对报文扫描一次，按 m.lastgroup 分派
+# （能见度、温度/露点都是独立字段，在 _parse_tokens 中按字段取）
+_METAR_RE = re.compile(
+    r'(?P<wind>(?P<wind_dir>\d{3}|VRB)(?P<wind_spd>\d{2,3})(?:G(?P<wind_gust>\d{2,3}))?KT)'
+    r'|(?P<cloud>\b(?P<cloud_amt>FEW|SCT|BKN|OVC)(?P<cloud_hgt>\d{3})\b)'
+)
+# 同一正则的 bytes 版本：纯 ASCII 报文按字节扫描，比 str 模式快约三成
+_METAR_RE_B = re.compile(_METAR_RE.pattern.encode("ascii"))
 
-    temperature = to_value(temp_str)
-    dewpoint = to_value(dew_str)
-    return temperature, dewpoint
 
+def _is_temp_part(s: str) -> bool:
+    """温度组的一半：两位数字，或 M 加两位数字"""
+    if len(s) == 3:
+        return s[0] == "M" and s[1:].isdigit()
+    return len(s) == 2 and s.isdigit()
 
-def _parse_wind(metar_text: str):
-    """
-    解析风:
-      - 27015KT
-      - 27015G25KT
-      - VRB02KT
-    """
-    wind_match = re.search(r'(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?KT', metar_text)
-    if not wind_match:
-        return None, None, None
-
-    dir_str = wind_match.group(1)
-    speed_str = wind_match.group(2)
-    gust_str = wind_match.group(3)
-
-    wind_direction = None if dir_str == "VRB" else int(dir_str)
-    wind_speed = int(speed_str)
-    wind_gust = int(gust_str) if gust_str else None
-
-    return wind_direction, wind_speed, wind_gust
 
+def _temp_value(s: str) -> int:
+    """温度/露点字段：28 -> 28，M02 -> -2"""
+    if len(s) == 3:  # M?\d{2}，三位即带 M
+        return -int(s[1:])
+    return int(s)
 
-def _parse_visibility(metar_text: str):
-    """解析能见度，简化为第一个独立的4位数字"""
-    vis_match = re.search(r'\b(\d{4})\b', metar_text)
-    if not vis_match:
-        return None
-    return int(vis_match.group(1))
 
-
-def _parse_station_and_time(metar_text: str):
+def _parse_tokens(tokens: List[str]):
     """
-    解析站号（VVCS/VVTS/VVNB 等）和观测时间（6位+Z）
+    按空格分隔的字段解析站号（VVCS/VVTS/VVNB 等）、观测时间（6位+Z）、
+    能见度（4位数字）和温度/露点（28/24、M02/M05），对字段只走一遍
     支持：
       - METAR VVCS 191200Z ...
       - SPECI VVTS 210530Z ...
       - VVNB 210600Z ...
+    METAR/SPECI 为 5 个字母，不会被当作站号；第一个 4 字母字段即站号；
+    第一个恰为 4 位数字的字段即能见度（9999 表示 10km 以上），
+    Q1008 之类的气压组带字母前缀，不会被误取；
+    温度组用 partition 按 '/' 切开，两半均合法才取
     """
-    tokens = metar_text.strip().split()
     station = None
     obs_time = None
+    visibility = None
+    temperature = dewpoint = None
 
-    # 找 station
-    for i, tok in enumerate(tokens):
-        if tok in ("METAR", "SPECI"):
-            # 下一个若是 4 字母则认为是站号
-            if i + 1 < len(tokens) and re.match(r'^[A-Z]{4}$', tokens[i + 1]):
-                station = tokens[i + 1]
-            continue
-
-    if station is None:
-        # 未显式带 METAR/SPECI，则第一个 4 字母 token 作为站号
-        for tok in tokens:
-            if re.match(r'^[A-Z]{4}$', tok):
-                station = tok
-                break
-
-    # 找观测时间（191200Z 这种）
     for tok in tokens:
-        if re.match(r'^\d{6}Z$', tok):
+        n = len(tok)
+        if n == 4 and tok.isascii():
+            if station is None and tok.isalpha():
+                station = sys.intern(tok)  # 站号只有寥寥几个，批量解析时共享同一对象
+            elif visibility is None and tok.isdigit():
+                visibility = int(tok)
+            else:
+                continue
+        elif obs_time is None and n == 7 and tok[6] == "Z" and tok.isascii() and tok[:6].isdigit():
             obs_time = tok
+        elif temperature is None and 5 <= n <= 7 and "/" in tok and tok.isascii():
+            temp_str, _, dew_str = tok.partition("/")
+            if not (_is_temp_part(temp_str) and _is_temp_part(dew_str)):
+                continue
+            temperature = _temp_value(temp_str)
+            dewpoint = _temp_value(dew_str)
+        else:
+            continue
+        if (
+            station is not None and obs_time is not None
+            and visibility is not None and temperature is not None
+        ):
             break
 
-    return station, obs_time
+    return station, obs_time, visibility, temperature, dewpoint
+
+
+# 云高编码 000-999（百英尺）-> 米，导入时一次算好
+# 纯整数运算四舍五入：code * 100ft * 0.3048 = code * 30.48m，与 round(浮点) 在 0-999 上逐项一致
+_FT_M_TABLE = [(code * 3048 + 50) // 100 for code in range(1000)]
+
+
+class CloudLayer(NamedTuple):
+    """一层云；不可变，缓存中的解析结果可放心共享"""
+    amount: str      # FEW/SCT/BKN/OVC
+    height_ft: int
+    height_m: int
 
 
-def _parse_clouds(metar_text: str) -> List[Dict]:
+def _cloud_layer(amount: str, height_code: int) -> CloudLayer:
     """
-    解析云量与云底高度:
+    云量与云底高度:
       FEW020 SCT025 BKN015 OVC010
     转换为:
       amount: FEW/SCT/BKN/OVC
       height_ft: 2000
       height_m: 610
-    最多返回 3 层云
     """
+    height_ft = height_code * 100   # 020 -> 20 * 100 = 2000ft
+    height_m = _FT_M_TABLE[height_code]  # 查表转换为米
+    return CloudLayer(amount, height_ft, height_m)
+
+
+# 云量只有四种取值：统一返回驻留的同一批字符串对象（numba 内核按序号取）
+_CLOUD_AMOUNTS = tuple(sys.intern(a) for a in ("FEW", "SCT", "BKN", "OVC"))
+# 正则扫描得到的云量（str 或 bytes）-> 驻留字符串
+_CLOUD_AMOUNT_STR = {
+    **{a: a for a in _CLOUD_AMOUNTS},
+    **{a.encode("ascii"): a for a in _CLOUD_AMOUNTS},
+}
+
+
+def _scan_fields_re(text: Union[str, bytes]):
+    """
+    对整条报文做一次 _METAR_RE 扫描（bytes 用 _METAR_RE_B），返回
+    (风向, 风速, 阵风, 云列表)
+    """
+    pattern = _METAR_RE_B if isinstance(text, bytes) else _METAR_RE
+    wind_direction = wind_speed = wind_gust = None
     clouds = []
-    # 匹配 FEW020 / SCT025 / BKN015 / OVC010
-    for amount, h_str in re.findall(r'\b(FEW|SCT|BKN|OVC)(\d{3})\b', metar_text):
-        height_code = int(h_str)        # 020 -> 20 (hundreds of feet)
-        height_ft = height_code * 100   # 20 * 100 = 2000ft
-        height_m = round(height_ft * 0.3048)  # 转换为米
-        clouds.append(
-            {
-                "amount": amount,
-                "height_ft": height_ft,
-                "height_m": height_m,
-            }
-        )
-        if len(clouds) >= 3:
+    # 尚未取到的槽位：风 1，云 3 层
+    pending = 4
+
+    # 单次扫描，各要素取第一次出现的值；云最多取 3 层，全部取到即停止
+    for m in pattern.finditer(text):
+        kind = m.lastgroup
+        if kind == "cloud":
+            if len(clouds) < 3:
+                amount = m.group("cloud_amt")
+                clouds.append(_cloud_layer(_CLOUD_AMOUNT_STR[amount], int(m.group("cloud_hgt"))))
+                pending -= 1
+        elif kind == "wind":
+            if wind_speed is None:
+                dir_str = m.group("wind_dir")
+                gust_str = m.group("wind_gust")
+                wind_direction = int(dir_str) if dir_str.isdigit() else None  # VRB
+                wind_speed = int(m.group("wind_spd"))
+                wind_gust = int(gust_str) if gust_str else None
+                pending -= 1
+        if not pending:
             break
 
-    return clouds
-
-
-# 天气现象与雨型逻辑 —— 完全沿用你之前的规则
-WEATHER_PATTERNS = {
-    r'\+RA': ('大雨', True, '大雨'),
-    r'\-RA': ('小雨', True, '小雨'),
-    r'\bRA\b': ('中雨', True, '中雨'),
-    r'\+SHRA': ('大阵雨', True, '大雨'),
-    r'\-SHRA': ('小阵雨', True, '小雨'),
-    r'\bSHRA\b': ('中阵雨', True, '中雨'),
-    r'TSRA': ('雷雨', True, '雷阵雨'),
-    r'\bTS\b': ('雷暴', False, None),
-    r'\bDZ\b': ('毛毛雨', True, '小雨'),
-    r'\bFG\b': ('雾', False, None),
-    r'\bBR\b': ('薄雾', False, None),
-    r'\bHZ\b': ('霾', False, None),
+    return wind_direction, wind_speed, wind_gust, clouds
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _is_word(c):
+        # 与 re 的 \w 一致（ASCII）：字母、数字、下划线
+        return (48 <= c <= 57) or (65 <= c <= 90) or (97 <= c <= 122) or c == 95
+
+    @njit(cache=True)
+    def _is_digit(c):
+        return 48 <= c <= 57
+
+    @njit(cache=True)
+    def _digits(buf, i, k):
+        # buf[i:i+k] 全为数字时返回其数值，否则 -1
+        if i + k > buf.shape[0]:
+            return -1
+        v = 0
+        for j in range(i, i + k):
+            c = buf[j]
+            if not _is_digit(c):
+                return -1
+            v = v * 10 + (c - 48)
+        return v
+
+    @njit(cache=True)
+    def _boundary_after(buf, i):
+        return i >= buf.shape[0] or not _is_word(buf[i])
+
+    @njit(cache=True)
+    def _scan_kernel(buf):
+        """
+        逐字节复现 _METAR_RE.finditer 的匹配顺序（wind > cloud，
+        命中后从匹配末尾继续），各要素取第一次出现的值，全部取到即停止。
+        返回 10 个整数：风向, 风速, 阵风,
+        以及 3 层云的 (云量序号, 云高编码)；缺测为 MISSING，云量序号缺测为 -1
+        修改 _METAR_RE 时须同步修改本函数，test_metar_scan.py 逐项比对两者
+        """
+        n = buf.shape[0]
+        wdir = wspd = wgust = MISSING
+        clouds = np.full(6, -1, dtype=np.int64)
+        n_clouds = 0
+        have_wind = False
+
+        p = 0
+        while p < n:
+            boundary = p == 0 or not _is_word(buf[p - 1])
+            end = -1
+
+            # ---- wind: (\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?KT
+            dir_v = _digits(buf, p, 3)
+            is_vrb = (
+                dir_v < 0 and p + 3 <= n
+                and buf[p] == 86 and buf[p + 1] == 82 and buf[p + 2] == 66  # 'VRB'
+            )
+            if dir_v >= 0 or is_vrb:
+                q = p + 3
+                for sl in (3, 2):
+                    spd = _digits(buf, q, sl)
+                    if spd < 0:
+                        continue
+                    r = q + sl
+                    gust = MISSING
+                    r_end = -1
+                    if r < n and buf[r] == 71:  # 'G'
+                        for gl in (3, 2):
+                            g = _digits(buf, r + 1, gl)
+                            k = r + 1 + gl
+                            if g >= 0 and k + 1 < n and buf[k] == 75 and buf[k + 1] == 84:
+                                gust = g
+                                r_end = k + 2
+                                break
+                    if r_end < 0 and r + 1 < n and buf[r] == 75 and buf[r + 1] == 84:  # 'KT'
+                        r_end = r + 2
+                    if r_end >= 0:
+                        end = r_end
+                        if not have_wind:
+                            have_wind = True
+                            wdir = MISSING if is_vrb else dir_v
+                            wspd = spd
+                            wgust = gust
+                        break
+
+            # ---- cloud: \b(FEW|SCT|BKN|OVC)(\d{3})\b
+            if end < 0 and boundary and p + 6 <= n:
+                a, b, c = buf[p], buf[p + 1], buf[p + 2]
+                amt = -1
+                if a == 70 and b == 69 and c == 87:
+                    amt = 0  # FEW
+                elif a == 83 and b == 67 and c == 84:
+                    amt = 1  # SCT
+                elif a == 66 and b == 75 and c == 78:
+                    amt = 2  # BKN
+                elif a == 79 and b == 86 and c == 67:
+                    amt = 3  # OVC
+                if amt >= 0:
+                    h = _digits(buf, p + 3, 3)
+                    if h >= 0 and _boundary_after(buf, p + 6):
+                        end = p + 6
+                        if n_clouds < 3:
+                            clouds[2 * n_clouds] = amt
+                            clouds[2 * n_clouds + 1] = h
+                            n_clouds += 1
+
+            if have_wind and n_clouds == 3:
+                break
+            p = end if end > p else p + 1
+
+        return (
+            wdir, wspd, wgust,
+            clouds[0], clouds[1], clouds[2], clouds[3], clouds[4], clouds[5],
+            n_clouds,
+        )
+
+else:
+    _scan_kernel = None
+
+
+def _scan_fields_njit(buf: bytes):
+    """_scan_fields_re 的 numba 版本，输入为 ASCII 字节串"""
+    out = _scan_kernel(np.frombuffer(buf, dtype=np.uint8))
+    wind_direction, wind_speed, wind_gust = (
+        None if v == MISSING else v for v in out[:3]
+    )
+    clouds = [
+        _cloud_layer(_CLOUD_AMOUNTS[out[3 + 2 * i]], out[4 + 2 * i])
+        for i in range(out[9])
+    ]
+    return wind_direction, wind_speed, wind_gust, clouds
+
+
+def _scan_fields(text: str):
+    """
+    提取风、云；纯 ASCII 报文先编码为 bytes，
+    装有 numba 时走编译后的逐字节扫描，否则走 bytes 正则；
+    含非 ASCII 字符时退回 str 正则
+    """
+    if not text.isascii():
+        return _scan_fields_re(text)
+    buf = text.encode("ascii")
+    if _scan_kernel is not None:
+        return _scan_fields_njit(buf)
+    return _scan_fields_re(buf)
+
+
+# 天气现象与雨型逻辑 —— 沿用你之前的规则
+# 雨型取值固定，表中统一引用这几个常量
+_RAIN_LIGHT = sys.intern("小雨")
+_RAIN_MODERATE = sys.intern("中雨")
+_RAIN_HEAVY = sys.intern("大雨")
+_RAIN_THUNDER = sys.intern("雷阵雨")
+
+# 现象键 -> (中文描述, 是否降水, 雨型)；表中顺序即雨型优先级（沿用原规则）
+_WX_TABLE: Dict[str, Tuple[str, bool, Optional[str]]] = {
+    "+RA": ("大雨", True, _RAIN_HEAVY),
+    "-RA": ("小雨", True, _RAIN_LIGHT),
+    "RA": ("中雨", True, _RAIN_MODERATE),
+    "+SHRA": ("大阵雨", True, _RAIN_HEAVY),
+    "-SHRA": ("小阵雨", True, _RAIN_LIGHT),
+    "SHRA": ("中阵雨", True, _RAIN_MODERATE),
+    "TSRA": ("雷雨", True, _RAIN_THUNDER),
+    "+TSRA": ("雷雨", True, _RAIN_THUNDER),
+    "-TSRA": ("雷雨", True, _RAIN_THUNDER),
+    "TS": ("雷暴", False, None),
+    "DZ": ("毛毛雨", True, _RAIN_LIGHT),
+    "+DZ": ("毛毛雨", True, _RAIN_LIGHT),
+    "-DZ": ("毛毛雨", True, _RAIN_LIGHT),
+    "FG": ("雾", False, None),
+    "BR": ("薄雾", False, None),
+    "HZ": ("霾", False, None),
 }
+_WX_RANK = {key: rank for rank, key in enumerate(_WX_TABLE)}
+_WX_ENTRIES = tuple(_WX_TABLE.values())
 
+# 复合现象组：[强度 +/- 或 VC 附近 / RE 近时][描述词][若干两字母现象代码]
+# 如 TSRAGR、+TSRAGS、VCTSRA、-RADZ
+_WX_GROUP_RE = re.compile(
+    r'(?P<prefix>[+-]|VC|RE)?'
+    r'(?P<desc>MI|BC|PR|DR|BL|SH|TS|FZ)?'
+    r'(?P<codes>(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)*)'
+)
 
-def _parse_weather_and_rain(metar_text: str):
+
+def _weather_group_ranks(tok: str, ranks: set):
+    """
+    把不能整体查表的现象组拆开查表，命中的 _WX_TABLE 序号加入 ranks
+    每个现象代码依次尝试：强度+描述词+代码（+TSRA）、强度+代码（-DZ）、代码
+    """
+    # 去掉强度符号后由两字母单元组成，站号以外的字段多数在这里就被排除
+    body = tok[1:] if tok[0] in "+-" else tok
+    if len(body) % 2 or not body.isalpha():
+        return
+    m = _WX_GROUP_RE.fullmatch(tok)
+    if m is None:
+        return
+
+    prefix, desc, codes = m.group("prefix", "desc", "codes")
+    if prefix == "RE":  # 近时天气，不是当前现象
+        return
+    intensity = prefix if prefix in ("+", "-") else ""  # VC 不影响查表
+    desc = desc or ""
+
+    if codes:
+        candidates = (
+            (intensity + desc + code, intensity + code, code)
+            for code in (codes[i:i + 2] for i in range(0, len(codes), 2))
+        )
+    else:
+        candidates = ((intensity + desc, desc),)  # 单独的描述词，如 TS
+
+    for keys in candidates:
+        for key in keys:
+            rank = _WX_RANK.get(key)
+            if rank is not None:
+                ranks.add(rank)
+                break
+
+
+def _parse_weather_and_rain(tokens: List[str]):
     """
     解析天气现象（中文描述列表）、是否下雨、雨型（小雨/中雨/大雨/雷阵雨）
-    完全保持你原来的逻辑
+    逐字段查表，复合现象组（TSRAGR、-RADZ 等）拆开后查表；
+    描述按 _WX_TABLE 顺序给出，表中最靠前的降水现象的雨型作为主雨型
     """
+    ranks = set()
+    for tok in tokens:
+        rank = _WX_RANK.get(tok)
+        if rank is not None:
+            ranks.add(rank)
+        elif tok.isalpha() or tok[0] in "+-":  # 含数字或 '/' 的字段不可能是现象组
+            _weather_group_ranks(tok, ranks)
+
     weather_desc = []
     is_raining = False
     rain_type = None
 
-    for pattern, (description, is_rain, r_type) in WEATHER_PATTERNS.items():
-        if re.search(pattern, metar_text):
+    for rank in sorted(ranks):
+        description, is_rain, r_type = _WX_ENTRIES[rank]
+        if description not in weather_desc:
             weather_desc.append(description)
-            if is_rain:
-                is_raining = True
-                # 使用第一个匹配到的雨型作为主雨型
-                if rain_type is None and r_type is not None:
-                    rain_type = r_type
+        if is_rain:
+            is_raining = True
+            if rain_type is None and r_type is not None:
+                rain_type = r_type
 
     return weather_desc, is_raining, rain_type
 
 
-def parse_metar(metar_text: str) -> Dict:
+@dataclass(frozen=True, slots=True)
+class MetarResult:
+    """
+    parse_metar() 的解析结果；字段顺序与原先返回的字典一致。
+    不可变：同一报文的解析结果会被缓存复用，weather 为元组，
+    clouds 为 CloudLayer 元组，to_dict() 时再转换为字典
+    """
+    raw: str
+    # 解析时间仅在 include_timestamp=True 时填写，默认不取系统时间
+    timestamp: Optional[str] = field(default=None, kw_only=True)
+    station: Optional[str]
+    obs_time: Optional[str]
+    temperature: Optional[int]
+    dewpoint: Optional[int]
+    wind_direction: Optional[int]
+    wind_speed: Optional[int]
+    wind_gust: Optional[int]
+    visibility: Optional[int]
+    weather: Tuple[str, ...]
+    is_raining: bool
+    rain_type: Optional[str]
+    clouds: Tuple[CloudLayer, ...]
+
+    def to_dict(self) -> Dict:
+        """转换为普通字典（供 st.json 等 Web 层使用），云层为字典列表"""
+        d = asdict(self)
+        d["clouds"] = [layer._asdict() for layer in self.clouds]
+        return d
+
+
+def _normalize(metar_text: Union[str, bytes]) -> Tuple[str, str]:
+    """
+    返回 (去空白的原始报文, 规范化后的报文)；bytes 按 ASCII 解码一次
+    报文多已是大写：str.strip() 无空白时返回原对象，已大写时也不再复制
+    规范化报文去掉末尾的报文结束符 "="，否则 27/24=、4000=、RA= 等
+    最后一个字段无法按字段识别
+    """
+    if isinstance(metar_text, bytes):
+        metar_text = metar_text.decode("ascii")
+    raw = metar_text.strip()
+    text = raw if raw.isupper() else raw.upper()
+    if text.endswith("="):
+        text = text[:-1]
+    return raw, text
+
+
+@lru_cache(maxsize=1024)
+def _parse_metar_cached(text: str) -> MetarResult:
+    """
+    按规范化（去空白、大写）后的报文缓存解析结果：轮询时同一份报文
+    会在下次更新前被反复提交，命中缓存即无需重新解析。
+    raw / timestamp 因调用而异，由 parse_metar 按需填入
+    """
+    tokens = text.split()
+
+    station, obs_time, visibility, temperature, dewpoint = _parse_tokens(tokens)
+    wind_direction, wind_speed, wind_gust, clouds = _scan_fields(text)
+
+    weather_desc, is_raining, rain_type = _parse_weather_and_rain(tokens)
+
+    return MetarResult(
+        raw=text,
+
+        station=station,
+        obs_time=obs_time,
+
+        temperature=temperature,
+        dewpoint=dewpoint,
+
+        wind_direction=wind_direction,
+        wind_speed=wind_speed,
+        wind_gust=wind_gust,
+
+        visibility=visibility,
+
+        weather=tuple(weather_desc),  # 中文描述
+        is_raining=is_raining,
+        rain_type=rain_type,          # 小雨/中雨/大雨/雷阵雨
+
+        clouds=tuple(clouds),         # 最多三层云
+    )
+
+
+def parse_metar(metar_text: Union[str, bytes], include_timestamp: bool = False) -> MetarResult:
     """
     面向你的 Web 小程序使用的统一解析接口
-    返回字典字段包括：
+    报文可为 str，也可为直接从文件/网络读到的 ASCII bytes
+    返回 MetarResult，字段包括：
       - raw: 原始报文
-      - timestamp: 解析时间（ISO）
       - station: 站号（VVCS 等）
       - obs_time: 报文时间（例如 191200Z）
       - temperature: 温度（℃）
@@ -173,41 +502,70 @@ def parse_metar(metar_text: str) -> Dict:
       - wind_speed: 风速（kt）
       - wind_gust: 阵风（kt）
       - visibility: 能见度（m）
-      - weather: 中文天气描述列表
+      - weather: 中文天气描述（元组）
       - is_raining: 是否在下雨
       - rain_type: 雨型（小雨/中雨/大雨/雷阵雨）
-      - clouds: 最多三层云，每层含 amount / height_ft / height_m
+      - clouds: 最多三层云（CloudLayer 元组），每层含 amount / height_ft / height_m
+      - timestamp: 解析时间（ISO），仅 include_timestamp=True 时填写，否则为 None
     """
-    text = metar_text.strip().upper()
-
-    station, obs_time = _parse_station_and_time(text)
-    temperature, dewpoint = _parse_temp_pair(text)
-    wind_direction, wind_speed, wind_gust = _parse_wind(text)
-    visibility = _parse_visibility(text)
-    clouds = _parse_clouds(text)
-    weather_desc, is_raining, rain_type = _parse_weather_and_rain(text)
-
-    result = {
-        "raw": metar_text.strip(),  # 保留原始大小写
-        "timestamp": datetime.now().isoformat(),
+    raw, text = _normalize(metar_text)
+
+    result = _parse_metar_cached(text)
+    if include_timestamp:
+        return replace(result, raw=raw, timestamp=datetime.now().isoformat())
+    if raw is not text:
+        return replace(result, raw=raw)  # 保留原始大小写
+    # 报文本身已规范化：直接复用缓存中的不可变结果
+    return result
 
-        "station": station,
-        "obs_time": obs_time,
 
+def parse_metar_batch(texts: List[Union[str, bytes]]) -> Dict:
+    """
+    批量解析，按字段返回并列数组（SoA），便于直接交给 NumPy / pandas：
+      - station / obs_time / rain_type: list[str | None]
+      - temperature / dewpoint / wind_direction / wind_speed / wind_gust /
+        visibility: np.int16 数组，缺测为 MISSING
+      - is_raining: np.bool_ 数组
+      - weather / clouds: 每条报文一个元组，含义同 parse_metar
+    不含 raw / timestamp，调用方已持有原始报文
+    逐条走 parse_metar 同一份缓存，重复报文不会重复解析
+    """
+    station_col, obs_time_col, rain_type_col = [], [], []
+    weather_col, clouds_col, raining_col = [], [], []
+    int_cols = ([], [], [], [], [], [])
+
+    for metar_text in texts:
+        r = _parse_metar_cached(_normalize(metar_text)[1])
+
+        station_col.append(r.station)
+        obs_time_col.append(r.obs_time)
+        values = (
+            r.temperature, r.dewpoint,
+            r.wind_direction, r.wind_speed, r.wind_gust,
+            r.visibility,
+        )
+        for col, v in zip(int_cols, values):
+            col.append(MISSING if v is None else v)
+        clouds_col.append(r.clouds)
+        weather_col.append(r.weather)
+        raining_col.append(r.is_raining)
+        rain_type_col.append(r.rain_type)
+
+    temperature, dewpoint, wind_direction, wind_speed, wind_gust, visibility = (
+        np.array(col, dtype=np.int16) for col in int_cols
+    )
+
+    return {
+        "station": station_col,
+        "obs_time": obs_time_col,
         "temperature": temperature,
         "dewpoint": dewpoint,
-
         "wind_direction": wind_direction,
         "wind_speed": wind_speed,
         "wind_gust": wind_gust,
-
         "visibility": visibility,
-
-        "weather": weather_desc,   # 中文描述列表
-        "is_raining": is_raining,
-        "rain_type": rain_type,    # 小雨/中雨/大雨/雷阵雨
-
-        "clouds": clouds,          # 最多三层云
+        "weather": weather_col,
+        "is_raining": np.array(raining_col, dtype=np.bool_),
+        "rain_type": rain_type_col,
+        "clouds": clouds_col,
     }
-
-    return result
@@ -0,0 +1,58 @@
+# test_metar_parser.py
+# parse_metar 解析结果的回归检查
+# 运行：在 condao_weather_app 目录下 python -m unittest test_metar_parser
+
+import unittest
+
+from metar_parser import parse_metar
+
+
+class TerminatorTest(unittest.TestCase):
+    """报文常以 ICAO 结束符 "=" 收尾，最后一个字段须照常解析"""
+
+    def test_temperature_before_terminator(self):
+        r = parse_metar("VVCS 201200Z 27015G25KT 4000 SCT018 27/24=")
+        self.assertEqual((r.temperature, r.dewpoint), (27, 24))
+
+        r = parse_metar("VVNB 210600Z VRB02KT 0800 FG M02/M05=")
+        self.assertEqual((r.temperature, r.dewpoint), (-2, -5))
+
+    def test_visibility_before_terminator(self):
+        r = parse_metar("VVCS 201200Z 27015G25KT 4000=")
+        self.assertEqual(r.visibility, 4000)
+
+    def test_raw_keeps_terminator(self):
+        text = "VVCS 201200Z 27015G25KT 4000 SCT018 27/24 Q1008="
+        self.assertEqual(parse_metar(text).raw, text)
+
+
+class WeatherTest(unittest.TestCase):
+    """天气现象与降雨类型：复合组按表拆分，附近现象 VC 不计入"""
+
+    def check(self, group, weather, rain_type):
+        r = parse_metar("VVCS 201200Z 27015KT 4000 %s SCT018 27/24 Q1008" % group)
+        self.assertEqual(r.weather, weather)
+        self.assertEqual(r.rain_type, rain_type)
+        self.assertEqual(r.is_raining, rain_type is not None)
+
+    def test_heavy_shower(self):
+        self.check("+SHRA", ("大阵雨",), "大雨")
+
+    def test_thunderstorm_rain(self):
+        self.check("TSRA", ("雷雨",), "雷阵雨")
+
+    def test_light_rain_with_mist(self):
+        self.check("-RA BR", ("小雨", "薄雾"), "小雨")
+
+    def test_vicinity_shower(self):
+        self.check("VCSH", (), None)
+
+    def test_weather_before_terminator(self):
+        r = parse_metar("VVCS 201200Z 27015KT 4000 RA=")
+        self.assertEqual(r.weather, ("中雨",))
+        self.assertTrue(r.is_raining)
+        self.assertEqual(r.rain_type, "中雨")
+
+
+if __name__ == "__main__":
+    unittest.main()
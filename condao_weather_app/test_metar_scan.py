@@ -0,0 +1,65 @@
+# test_metar_scan.py
+# 风 / 云扫描的一致性检查：_scan_kernel（numba）必须与 _METAR_RE 逐项一致
+# 运行：在 condao_weather_app 目录下 python -m unittest test_metar_scan
+
+import random
+import unittest
+
+import metar_parser as mp
+
+# 典型报文
+_REPORTS = [
+    "VVCS 201200Z 27015G25KT 4000 +SHRA TS SCT018 BKN030 OVC100 27/24 Q1008",
+    "METAR VVCS 191200Z 09005KT 9999 FEW020 SCT100 30/24 Q1010",
+    "SPECI VVTS 210530Z 18008KT 3000 -RA BR BKN012 OVC040 25/24 Q1009",
+    "VVNB 210600Z VRB02KT 0800 FG VV002 M02/M05 Q1020",
+    "VVCS 010030Z 12010KT 8000 TSRA FEW015CB SCT020 BKN080 29/25 Q1011",
+    "VVCS 010100Z 120100G120KT 6000 RA SCT020 27/25 Q1010",
+    "VVCS 010130Z 12010KT 7000 -SHRA FEW010 SCT015 BKN020 OVC030 26/24 Q1010",
+    "VVCS 201200Z 27015G25KT 4000 +SHRA TS SCT018 BKN030 OVC100 27/24 Q1008=",
+    "",
+]
+
+# 随机拼接用的片段：正常字段、边界情况（\b、阵风/风速位数回溯、粘连字段）
+_PIECES = [
+    "VVCS", "201200Z", "27015G25KT", "VRB02KT", "120100G120KT", "27015G5KT",
+    "2701KT", "27015GKT", "00000KT", "4000", "9999", "12345",
+    "+SHRA", "TS", "SCT018", "BKN030", "OVC100", "FEW015CB", "FEW01", "FEW020/",
+    "SCT018SCT019", "27/24", "M02/M05", "Q1008", "/", "M", "G", "KT", "_4000",
+    "A4000", "VV002", "=", "-", "",
+]
+_CHARS = "0123456789MGKTVRB/ FEWSCTBKNOVC_"
+
+
+def _cases(seed=20240601, n_join=20000, n_chars=10000):
+    rng = random.Random(seed)
+    yield from _REPORTS
+    for _ in range(n_join):
+        sep = rng.choice([" ", " ", " ", "", "  "])
+        yield sep.join(rng.choice(_PIECES) for _ in range(rng.randint(0, 10)))
+    for _ in range(n_chars):
+        yield "".join(rng.choice(_CHARS) for _ in range(rng.randint(0, 30)))
+
+
+class ScanParityTest(unittest.TestCase):
+
+    def test_bytes_regex_matches_str_regex(self):
+        for text in _cases():
+            self.assertEqual(
+                mp._scan_fields_re(text.encode("ascii")),
+                mp._scan_fields_re(text),
+                text,
+            )
+
+    @unittest.skipIf(mp._scan_kernel is None, "未安装 numba")
+    def test_numba_kernel_matches_regex(self):
+        for text in _cases():
+            self.assertEqual(
+                mp._scan_fields_njit(text.encode("ascii")),
+                mp._scan_fields_re(text),
+                text,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()